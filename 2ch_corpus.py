@@ -1,13 +1,46 @@
 import json
+import logging
 import re
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Third-party: urllib3 is required (pip install urllib3); orjson is used if installed.
+import urllib3
+
+try:
+    from orjson import loads as _jloads
+except ImportError:
+    _jloads = json.loads
 
 CATALOG = "https://2ch.hk/b/catalog.json"
+# Batch size in characters; mostly-Cyrillic posts take ~2 UTF-8 bytes each, so ~64 KB per write.
+WRITE_CHUNK_CHARS = 1 << 15
+FETCH_WORKERS = 16
+
+# Shared keep-alive connections, so each thread fetch skips the TCP/TLS handshake.
+_HTTP = urllib3.PoolManager(maxsize=FETCH_WORKERS, headers={'Accept-Encoding': 'gzip'})
+
+_HTML_RE = re.compile(r'<.*?>')
+_DIGIT_RE = re.compile(r"\d+")
+# Tags and digits are removed in the same pass as symbols, so a symbol sequence
+# must still match when they sit between its characters (e.g. "12-05-2020").
+_SKIP = r"(?:\d+|<[^>\n]*>)*"
+_SYMBOL_SEQS = (">>", "&#", "&gt;", "(оп)", "(op)", "()", "--", "..", "))", "??")
+# Multi-character sequences first, then every single-character symbol in one class.
+_SYMBOLS_RE = re.compile("|".join(_SKIP.join(map(re.escape, seq)) for seq in _SYMBOL_SEQS) + r"|[a-zA-Z~;:—@&=_]")
+_EMPTY_RE = re.compile(r"\(\)|\.\.|\.\.\.")
+# Tags, symbols and digits in one alternation so a post is scanned once.
+_CLEAN_RE = re.compile("|".join((_HTML_RE.pattern, _SYMBOLS_RE.pattern, _DIGIT_RE.pattern)))
 
 
 def get_json(req_url):
-    with urllib.request.urlopen(req_url) as url:
-        return json.loads(url.read().decode())
+    resp = _HTTP.request('GET', req_url)
+    if resp.status != 200:
+        raise urllib3.exceptions.HTTPError("%s returned HTTP %d" % (req_url, resp.status))
+    try:
+        return _jloads(resp.data)
+    except ValueError:
+        # orjson rejects lone surrogate escapes that json accepts; encode_posts drops those posts later.
+        return json.loads(resp.data)
 
 
 def get_thread_url(id):
@@ -20,45 +53,65 @@ def get_threads_ids():
         yield thread['num']
 
 
-def remove_html_tags(s):
-    p = re.compile(r'<.*?>')
-    return p.sub('', s)
+def cleanse_text(s):
+    s = _CLEAN_RE.sub("", s)
+    return _EMPTY_RE.sub("", s).lower().strip()
 
 
-def remove_numers(s):
-    return re.sub(r"\d+", "", s)
-
-
-def remove_symbols(s):
-    s = re.sub(r">>\d+|&#|>>|&gt;|~|;|\(оп\)|\(op\)|\-\-|\.\.|\.\.\.|—|\:|[a-zA-Z]|\)\)|\?\?|\@|\&|\(\)|\=|\_", "", s)
-    return re.sub(r"\(\)|\.\.|\.\.\.", "", s)
+def encode_posts(posts):
+    try:
+        return ("\n".join(posts) + "\n").encode('utf-8')
+    except UnicodeEncodeError:
+        # Lone surrogates from JSON escapes can't be encoded; drop just those posts.
+        return b"".join(encode_post(post) for post in posts)
 
 
-def cleanse_text(str):
-    str = remove_html_tags(str)
-    str = remove_numers(str)
-    str = remove_symbols(str)
-    return str.lower().strip()
+def encode_post(post):
+    try:
+        return (post + "\n").encode('utf-8')
+    except UnicodeEncodeError:
+        return b""
 
 
 def get_all_posts():
-    for thread_id in get_threads_ids():
-        try:
-            posts = get_json(get_thread_url(thread_id))['threads'][0]['posts']
+    cleanse = cleanse_text
+    pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    try:
+        futures = {pool.submit(get_json, get_thread_url(thread_id)) for thread_id in get_threads_ids()}
+        for future in as_completed(futures):
+            # Drop our reference so the parsed thread can be freed once its posts are yielded.
+            futures.discard(future)
+            try:
+                posts = future.result()['threads'][0]['posts']
+            except (urllib3.exceptions.HTTPError, ValueError, KeyError, IndexError) as e:
+                logging.debug("Skipping thread: %s" % e)
+                continue
             for post in posts:
-                comment = cleanse_text(post['comment']);
+                comment = cleanse(post.get('comment') or '')
                 if (len(comment) > 5):
                     yield comment  # , int(post['num']), int(post['parent'])
-        except:
-            pass
-
-
-posts = get_all_posts()
-f = open('result.txt', 'w')
-for post in posts:
-    try:
-        f.write(post)
-        f.write("\n")
-        f.flush()
-    except:
-        pass
+    finally:
+        # Don't wait for queued fetches if the consumer stops early or is interrupted.
+        pool.shutdown(cancel_futures=True)
+
+
+def main():
+    posts = get_all_posts()
+    with open('result.txt', 'wb', buffering=1 << 20) as f:
+        buf = []
+        size = 0
+        append = buf.append
+        write = f.write
+        for post in posts:
+            append(post)
+            size += len(post) + 1
+            if size > WRITE_CHUNK_CHARS:
+                write(encode_posts(buf))
+                buf.clear()
+                size = 0
+        if buf:
+            write(encode_posts(buf))
+
+
+if __name__ == "__main__":
+    main()
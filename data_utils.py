@@ -20,11 +20,15 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import io
+import locale
 import logging
+import multiprocessing
 import os
 import re
-
-import nltk
+from collections import Counter
+from functools import reduce
+from operator import iadd
 
 # Special vocabulary symbols - we always put them at the start.
 _PAD = "_PAD"
@@ -38,9 +42,15 @@ GO_ID = 1
 EOS_ID = 2
 UNK_ID = 3
 
+# Number of token-id lines collected before each write in data_to_token_ids.
+_WRITE_BATCH_LINES = 1000
+# Smallest slice of the data file worth handing to a separate counting process.
+_MIN_CHUNK_BYTES = 1 << 22
+
 # Regular expressions used to tokenize.
 _WORD_SPLIT = re.compile('(\. |^|!|\?)([A-Z][^;\.<>@\^&/\[\]]*(\.|!|\?) )')
-_DIGIT_RE = re.compile(r"\d")
+_DIGIT_RE = re.compile(r"[0-9]")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
 
 
 def get_train_path(directory):
@@ -50,8 +60,40 @@ def get_train_path(directory):
 
 
 def tokenize(sentence):
-    """Very basic tokenizer: split the sentence into a list of tokens."""
-    return nltk.word_tokenize(sentence)
+    """Very basic tokenizer: split the sentence into words and punctuation marks."""
+    return _TOKEN_RE.findall(sentence)
+
+
+def _chunk_ranges(data_path, num_chunks):
+    """Split data file into num_chunks byte ranges that start at line boundaries."""
+    size = os.stat(data_path).st_size
+    bounds = [0]
+    with open(data_path, mode="rb") as f:
+        for i in range(1, num_chunks):
+            f.seek(max(size * i // num_chunks, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(data_path, start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def _count_chunk(args):
+    """Count tokens of the lines in [start, end) byte range of a data file."""
+    data_path, start, end, normalize_digits = args
+    encoding = locale.getpreferredencoding(False)
+    vocab = Counter()
+    with open(data_path, mode="rb") as f:
+        f.seek(start)
+        pos = start
+        for raw in f:
+            if pos >= end:
+                break
+            pos += len(raw)
+            line = raw.decode(encoding)
+            if normalize_digits:
+                line = _DIGIT_RE.sub("0", line)
+            vocab.update(tokenize(line))
+    return vocab
 
 
 def create_vocabulary(vocabulary_path, data_path, max_vocabulary_size, normalize_digits=True):
@@ -71,26 +113,24 @@ def create_vocabulary(vocabulary_path, data_path, max_vocabulary_size, normalize
     """
     if not os.path.exists(vocabulary_path):
         logging.debug("Creating vocabulary %s from data %s" % (vocabulary_path, data_path))
-        vocab = {}
-        with open(data_path, mode="r") as f:
-            counter = 0
-            for line in f:
-                counter += 1
-                if counter % 100000 == 0:
-                    print("  processing line %d" % counter)
-                tokens = tokenize(line)
-                for w in tokens:
-                    word = _DIGIT_RE.sub("0", w) if normalize_digits else w
-                    if word in vocab:
-                        vocab[word] += 1
-                    else:
-                        vocab[word] = 1
-            vocab_list = _START_VOCAB + sorted(vocab, key=vocab.get, reverse=True)
-            if len(vocab_list) > max_vocabulary_size:
-                vocab_list = vocab_list[:max_vocabulary_size]
-            with open(vocabulary_path, mode="w") as vocab_file:
-                for w in vocab_list:
-                    vocab_file.write(w + "\n")
+        num_chunks = max(1, min(multiprocessing.cpu_count(), os.stat(data_path).st_size // _MIN_CHUNK_BYTES))
+        chunks = [r + (normalize_digits,) for r in _chunk_ranges(data_path, num_chunks)]
+        pool = multiprocessing.Pool(len(chunks)) if len(chunks) > 1 else None
+        try:
+            counts = []
+            for chunk_vocab in (pool.imap if pool else map)(_count_chunk, chunks):
+                counts.append(chunk_vocab)
+                logging.debug("  counted chunk %d of %d" % (len(counts), len(chunks)))
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        # Merging in file order keeps ties in first-seen order, as a single pass would.
+        vocab = reduce(iadd, counts, Counter())
+        vocab_list = _START_VOCAB + [w for w, _ in vocab.most_common(max_vocabulary_size - len(_START_VOCAB))]
+        with io.open(vocabulary_path, mode="w", encoding="utf-8") as vocab_file:
+            for w in vocab_list:
+                vocab_file.write(w + "\n")
 
 
 def initialize_vocabulary(vocabulary_path):
@@ -109,11 +149,9 @@ def initialize_vocabulary(vocabulary_path):
       ValueError: if the provided vocabulary_path does not exist.
     """
     if os.path.exists(vocabulary_path):
-        rev_vocab = []
-        with open(vocabulary_path, mode="r") as f:
-            rev_vocab.extend(f.readlines())
-        rev_vocab = [line.strip() for line in rev_vocab]
-        vocab = dict([(x, y) for (y, x) in enumerate(rev_vocab)])
+        with io.open(vocabulary_path, mode="r", encoding="utf-8", buffering=1 << 20) as f:
+            rev_vocab = [line.strip() for line in f]
+        vocab = {x: y for (y, x) in enumerate(rev_vocab)}
         return vocab, rev_vocab
     else:
         raise ValueError("Vocabulary file %s not found.", vocabulary_path)
@@ -133,8 +171,8 @@ def sentence_to_token_ids(sentence, vocabulary, normalize_digits=True):
       a list of integers, the token-ids for the sentence.
     """
     words = tokenize(sentence)
-
-    return [vocabulary.get(w, UNK_ID) for w in words]
+    get = vocabulary.get
+    return [get(w, UNK_ID) for w in words]
     # Normalize digits by 0 before looking words up in the vocabulary.
 
 
@@ -155,14 +193,20 @@ def data_to_token_ids(data_path, target_path, vocabulary_path, normalize_digits=
         logging.debug("Tokenizing data in %s" % data_path)
         vocab, _ = initialize_vocabulary(vocabulary_path)
         with open(data_path, mode="r") as data_file:
-            with open(target_path, mode="w") as tokens_file:
+            with open(target_path, mode="w", buffering=1 << 20) as tokens_file:
                 counter = 0
+                batch = []
                 for line in data_file:
                     counter += 1
                     if counter % 100000 == 0:
                         logging.debug("  tokenizing line %d" % counter)
                     token_ids = sentence_to_token_ids(line, vocab, normalize_digits)
-                    tokens_file.write(" ".join([str(tok) for tok in token_ids]) + "\n")
+                    batch.append(" ".join(map(str, token_ids)))
+                    if len(batch) == _WRITE_BATCH_LINES:
+                        tokens_file.write("\n".join(batch) + "\n")
+                        batch = []
+                if batch:
+                    tokens_file.write("\n".join(batch) + "\n")
 
 
 def prepare_wmt_data(data_dir, en_vocabulary_size, fr_vocabulary_size):